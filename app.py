@@ -1,15 +1,58 @@
 import streamlit as st
-import feedparser
+import aiohttp
+import asyncio
 import openai
-import pyperclip
+import httpx
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from st_copy_to_clipboard import st_copy_to_clipboard
 import datetime
+import functools
+import heapq
+import threading
+import queue
+from contextlib import contextmanager
+import json
+import csv
+import re
+import hashlib
+from urllib.parse import quote_plus, urlparse
 from email.utils import parsedate_to_datetime
 import sqlite3
-import pandas as pd
+import numpy as np
 
-# --- Secrets & OpenAI Key ---
+# --- Secrets & OpenAI Client ---
 PASSWORD = st.secrets["PASSWORD"]
-openai.api_key = st.secrets["OPENAI_API_KEY"]
+
+@st.cache_resource
+def get_openai_client():
+    # one client per process so its HTTP connection pool survives reruns;
+    # retries are handled by openai_retry below, not by the SDK
+    return openai.OpenAI(api_key=st.secrets["OPENAI_API_KEY"], max_retries=0)
+
+@st.cache_resource
+def get_async_openai_client():
+    # HTTP/2 multiplexes the concurrent analysis calls over a few kept-alive connections
+    http = httpx.AsyncClient(
+        http2=True,
+        timeout=30,
+        limits=httpx.Limits(max_keepalive_connections=32, keepalive_expiry=60)
+    )
+    return openai.AsyncOpenAI(
+        api_key=st.secrets["OPENAI_API_KEY"], max_retries=0, http_client=http
+    )
+
+@st.cache_resource
+def get_event_loop():
+    # one long-lived loop, so the cached async client's connections stay usable
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+def run_async(coro):
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop()).result()
+
+client = get_openai_client()
+aclient = get_async_openai_client()
 
 # --- Load all users from Secrets ---
 users = dict(st.secrets["credentials"]["usernames"])
@@ -20,7 +63,11 @@ if "authenticated" not in st.session_state:
 if "raw_news" not in st.session_state:
     st.session_state.raw_news = []
 if "filtered_news" not in st.session_state:
-    st.session_state.filtered_news = ""
+    st.session_state.filtered_news = []
+if "outreach_ids" not in st.session_state:
+    st.session_state.outreach_ids = {}
+if "email_drafts" not in st.session_state:
+    st.session_state.email_drafts = {}
 if "easter_count" not in st.session_state:
     st.session_state.easter_count = 0
 
@@ -47,35 +94,136 @@ with st.sidebar:
             st.experimental_rerun()
 
 # --- SQLite for Tracking ---
-conn = sqlite3.connect('outreach.db', check_same_thread=False)
-c = conn.cursor()
-c.execute("""
-CREATE TABLE IF NOT EXISTS outreach (
-  id      INTEGER PRIMARY KEY,
-  user    TEXT,
-  title   TEXT,
-  ts      TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-  used    INTEGER,
-  success INTEGER
+# a few read-only connections plus one lock-guarded writer, all in WAL mode
+class ConnectionPool:
+    def __init__(self, path, readers=4):
+        self.writer = self._connect(path)
+        self.write_lock = threading.Lock()
+        self.readers = queue.Queue()
+        for _ in range(readers):
+            r = self._connect(path)
+            r.execute("PRAGMA query_only=1")
+            self.readers.put(r)
+
+    @staticmethod
+    def _connect(path):
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.executescript(
+            "PRAGMA journal_mode=WAL;"
+            "PRAGMA synchronous=NORMAL;"
+            "PRAGMA cache_size=-8000;"
+            "PRAGMA temp_store=MEMORY;"
+            "PRAGMA mmap_size=134217728;"
+        )
+        return conn
+
+    @contextmanager
+    def read(self):
+        conn = self.readers.get()
+        try:
+            yield conn
+        finally:
+            self.readers.put(conn)
+
+    @contextmanager
+    def write(self):
+        # the connection context manager commits, or rolls back on error
+        with self.write_lock, self.writer:
+            yield self.writer
+
+@st.cache_resource
+def get_db():
+    db = ConnectionPool('outreach.db')
+    with db.write() as w:
+        w.execute("""
+        CREATE TABLE IF NOT EXISTS outreach (
+          id      INTEGER PRIMARY KEY,
+          user    TEXT,
+          title   TEXT,
+          ts      TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+          used    INTEGER,
+          success INTEGER
+        )
+        """)
+        w.execute(
+            "CREATE INDEX IF NOT EXISTS idx_outreach_user_title_ts ON outreach(user, title, ts DESC)"
+        )
+        w.execute("""
+        CREATE TABLE IF NOT EXISTS gpt_cache (
+          key      TEXT PRIMARY KEY,
+          response TEXT,
+          ts       TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        w.execute("""
+        CREATE TABLE IF NOT EXISTS embeddings (
+          headline TEXT PRIMARY KEY,
+          vec      BLOB,
+          analysis TEXT,
+          ts       TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """)
+        # databases from before ts existed: old rows have NULL ts, so they count as expired
+        if "ts" not in [c[1] for c in w.execute("PRAGMA table_info(embeddings)")]:
+            w.execute("ALTER TABLE embeddings ADD COLUMN ts TIMESTAMP")
+        w.execute("""
+        CREATE TABLE IF NOT EXISTS feed_meta (
+          url      TEXT PRIMARY KEY,
+          etag     TEXT,
+          modified TEXT,
+          body     BLOB
+        )
+        """)
+    return db
+
+db = get_db()
+
+# fixed statement text so sqlite3's statement cache reuses the compiled plan
+SQL_MARK_USED = "INSERT INTO outreach(user,title,used) VALUES (?,?,1)"
+SQL_MARK_OUTCOME = "UPDATE outreach SET success=? WHERE id=?"
+# fallback when this session didn't insert the row itself (e.g. after re-login)
+SQL_MARK_OUTCOME_LATEST = """
+UPDATE outreach SET success=? WHERE id=(
+  SELECT id FROM outreach WHERE user=? AND title=? ORDER BY ts DESC, id DESC LIMIT 1
 )
-""")
-conn.commit()
+"""
+
+def mark_outcome(title, success):
+    row_id = st.session_state.outreach_ids.get(title)
+    with db.write() as w:
+        if row_id is not None:
+            cur = w.execute(SQL_MARK_OUTCOME, (success, row_id))
+        else:
+            cur = w.execute(
+                SQL_MARK_OUTCOME_LATEST, (success, st.session_state.username, title)
+            )
+    _load_stats.clear()
+    return cur.rowcount > 0
 
 # --- Sidebar Statistics & Reset ---
+@st.cache_data(ttl=30, show_spinner=False)
+def _load_stats(user):
+    # heavy imports are deferred so the login page starts without them
+    import pandas as pd
+
+    with db.read() as r:
+        attempts, succ, fail = r.execute(
+            """
+            SELECT COALESCE(SUM(used=1), 0),
+                   COALESCE(SUM(success=1), 0),
+                   COALESCE(SUM(success=0), 0)
+            FROM outreach WHERE user=?
+            """,
+            (user,)
+        ).fetchone()
+    return pd.DataFrame({
+        "count": [attempts, succ, fail]
+    }, index=["Attempts", "Successes", "Failures"])
+
 user = st.session_state.username
-attempts = c.execute(
-    "SELECT COUNT(*) FROM outreach WHERE user=? AND used=1", (user,)
-).fetchone()[0]
-succ = c.execute(
-    "SELECT COUNT(*) FROM outreach WHERE user=? AND success=1", (user,)
-).fetchone()[0]
-fail = c.execute(
-    "SELECT COUNT(*) FROM outreach WHERE user=? AND success=0", (user,)
-).fetchone()[0]
-
-stats_df = pd.DataFrame({
-    "count": [attempts, succ, fail]
-}, index=["Attempts", "Successes", "Failures"])
+stats_df = _load_stats(user)
+attempts, succ = stats_df.at["Attempts", "count"], stats_df.at["Successes", "count"]
+
 st.sidebar.bar_chart(stats_df["count"], use_container_width=True)
 st.sidebar.write(
     f"Success rate: {succ}/{attempts} "
@@ -83,8 +231,10 @@ st.sidebar.write(
 )
 
 if st.sidebar.button("🔄 Reset stats"):
-    c.execute("DELETE FROM outreach WHERE user=?", (user,))
-    conn.commit()
+    with db.write() as w:
+        w.execute("DELETE FROM outreach WHERE user=?", (user,))
+    st.session_state.outreach_ids = {}
+    _load_stats.clear()
     st.experimental_rerun()
 
 # --- Main UI ---
@@ -103,73 +253,414 @@ keywords_by_sector = {
     "B2B Manufacturing & Logistics": ["manufacturing","logistics","supply chain","industrial","infrastructure","DACH"]
 }
 
-# --- Fetch & Filter Functions ---
-def fetch_recent_news(keywords):
-    q = "+".join(kw.replace(" ","+") for kw in keywords)
-    feeds = [
+def _build_feed_urls(keywords):
+    q = "+".join(quote_plus(kw) for kw in keywords)
+    return (
         f"https://news.google.com/rss/search?q={q}",
         "https://feeds.reuters.com/reuters/businessNews",
         "https://feeds.reuters.com/reuters/worldNews",
         "https://www.bloomberg.com/feed/podcast/bloomberg-surveillance.xml",
         f"https://www.bing.com/news/search?q={q}&format=rss",
         "https://www.ft.com/news-feed?format=rss"
-    ]
-    one_week_ago = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=7)
-    entries, seen = [], set()
-    for url in feeds:
-        for e in feedparser.parse(url).entries:
-            try:
-                pub_dt = parsedate_to_datetime(e.get("published",""))
-                pub_dt = (
-                    pub_dt.replace(tzinfo=datetime.timezone.utc)
-                    if pub_dt.tzinfo is None
-                    else pub_dt.astimezone(datetime.timezone.utc)
+    )
+
+FEEDS_BY_SECTOR = {
+    sector: _build_feed_urls(kws)
+    for sector, kws in keywords_by_sector.items()
+}
+SECTOR_PATTERN = {
+    sector: re.compile("|".join(re.escape(kw) for kw in kws), re.I)
+    for sector, kws in keywords_by_sector.items()
+}
+
+# --- Fetch & Filter Functions ---
+UTC = datetime.timezone.utc
+RFC822_DATE = re.compile(r"^(Mon|Tue|Wed|Thu|Fri|Sat|Sun), ")
+MAX_FEED_BYTES = 5 * 1024 * 1024
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date(published):
+    # feeds repeat the same date strings a lot, so each is parsed once;
+    # the shape check keeps malformed dates away from the full parser
+    if len(published) < 25 or not RFC822_DATE.match(published):
+        return None
+    try:
+        pub_dt = parsedate_to_datetime(published)
+    except (TypeError, ValueError):
+        return None
+    if pub_dt.tzinfo is None:
+        pub_dt = pub_dt.replace(tzinfo=UTC)
+    return pub_dt.timestamp()
+
+def norm_title(t):
+    # \w is Unicode-aware, so non-Latin titles keep their words
+    return " ".join(re.sub(r"[^\w\s]", "", t.lower()).split()[:8])
+
+async def _fetch(session, url, etag=None, modified=None):
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if modified:
+        headers["If-Modified-Since"] = modified
+    async with session.get(url, headers=headers) as r:
+        if r.status == 304:
+            return None
+        r.raise_for_status()
+        # read in chunks and give up on oversized feeds instead of buffering them whole
+        chunks, size = [], 0
+        async for chunk in r.content.iter_chunked(64 * 1024):
+            size += len(chunk)
+            if size > MAX_FEED_BYTES:
+                raise ValueError(f"feed over {MAX_FEED_BYTES} bytes: {url}")
+            chunks.append(chunk)
+        return r.headers.get("ETag"), r.headers.get("Last-Modified"), b"".join(chunks)
+
+@st.cache_resource
+def parsed_feeds():
+    # url -> (etag, modified, parsed feed), shared by every session in this process
+    return {}
+
+async def _fetch_and_parse(session, url, etag=None, modified=None, body=None, feed=None):
+    import feedparser
+
+    fresh = await _fetch(session, url, etag, modified)
+    # None means 304 Not Modified: reuse the parsed feed, else the stored body
+    if fresh is None and feed is not None:
+        return fresh, feed
+    if fresh is not None:
+        body = fresh[2]
+    # parse in a worker thread so the other downloads keep progressing
+    loop = asyncio.get_running_loop()
+    return fresh, await loop.run_in_executor(None, feedparser.parse, body)
+
+async def _fetch_all(urls, meta):
+    import feedparser
+
+    headers = {"User-Agent": feedparser.USER_AGENT}
+    connector = aiohttp.TCPConnector(limit=32, limit_per_host=4)
+    timeout = aiohttp.ClientTimeout(total=8)
+    async with aiohttp.ClientSession(headers=headers, connector=connector, timeout=timeout) as s:
+        return await asyncio.gather(
+            *[_fetch_and_parse(s, u, *meta.get(u, ())) for u in urls],
+            return_exceptions=True
+        )
+
+@st.cache_data(ttl=900, show_spinner=False)
+def fetch_recent_news(feeds):
+    one_week_ago = (datetime.datetime.now(UTC) - datetime.timedelta(days=7)).timestamp()
+    entries, seen, seen_titles = [], set(), set()
+    parsed = parsed_feeds()
+    meta, need_body = {}, []
+    marks = ",".join("?" * len(feeds))
+    with db.read() as r:
+        rows = r.execute(
+            f"SELECT url, etag, modified FROM feed_meta WHERE url IN ({marks})", feeds
+        ).fetchall()
+        for url, etag, modified in rows:
+            prev = parsed.get(url)
+            feed = prev[2] if prev and prev[:2] == (etag, modified) else None
+            meta[url] = (etag, modified, None, feed)
+            if feed is None:
+                need_body.append(url)
+        # stored bodies are only needed when there's no parsed copy, e.g. after a restart
+        if need_body:
+            marks = ",".join("?" * len(need_body))
+            for url, body in r.execute(
+                f"SELECT url, body FROM feed_meta WHERE url IN ({marks})", need_body
+            ):
+                meta[url] = meta[url][:2] + (body, None)
+    for url, res in zip(feeds, run_async(_fetch_all(feeds, meta))):
+        if isinstance(res, Exception):
+            continue
+        fresh, feed = res
+        if fresh is not None:
+            etag, modified, body = fresh
+            with db.write() as w:
+                w.execute(
+                    "INSERT OR REPLACE INTO feed_meta(url,etag,modified,body) VALUES (?,?,?,?)",
+                    (url, etag, modified, body)
                 )
-            except:
-                continue
-            if pub_dt < one_week_ago:
+        else:
+            etag, modified = meta[url][:2]
+        parsed[url] = (etag, modified, feed)
+        for e in feed.entries:
+            published = e.get("published","")
+            pub_ts = _parse_date(published)
+            if pub_ts is None or pub_ts < one_week_ago:
                 continue
             link = e.get("link","")
             if link in seen:
                 continue
             seen.add(link)
-            entries.append(f"{e.get('title','')} | {link} | {e.get('published','')}")
-            if len(entries) >= 20:
-                break
-    return entries
+            # the same story reappears across aggregators under different links
+            title = e.get("title","")
+            nt = norm_title(title)
+            if nt:
+                if nt in seen_titles:
+                    continue
+                seen_titles.add(nt)
+            entries.append((pub_ts, f"{title} | {link} | {published}"))
+    return [line for _, line in heapq.nlargest(20, entries, key=lambda x: x[0])]
+
+# --- Prompts (static text first so OpenAI's prefix cache can match) ---
+FILTER_SYSTEM = """You are a research assistant for Sales at Oxford Economics.
+You receive a sector name and a numbered list of news headlines.
+Select only the headlines that are B2B-relevant for European companies in that sector.
+Reply as CSV with one line per selected headline: index,region
+for example:
+3,EU
+7,UK
+Output nothing else."""
+
+ANALYZE_SYSTEM = """You are a sales assistant at Oxford Economics.
+For the headline you are given, reply with a JSON object with exactly these keys:
+"persona": one relevant persona to contact,
+"impact": impact rating from 1 to 5,
+"subject": a 6-8 word email subject line.
+Be terse: persona is a few words, impact is only the number."""
+
+EMAIL_SYSTEM = """You are a sales assistant at Oxford Economics.
+Given a persona and a news headline, write a concise outreach email to that
+persona that uses the headline as the hook. Output only the email body."""
 
-def openai_chat(prompt, model="gpt-3.5-turbo", temp=0.2):
-    r = openai.chat.completions.create(
+# per-call user messages, filled in with str.format
+PROMPT_FILTER   = "Sector: {sector}\n\n{headlines}"
+PROMPT_ANALYZE  = "Headline: {title}"
+PROMPT_EMAIL    = "Persona: {persona}\nHeadline: {title}"
+
+openai_retry = retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(min=0.5, max=4),
+    retry=retry_if_exception_type(
+        (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+    ),
+    reraise=True
+)
+
+@openai_retry
+async def _create_chat_async(**kwargs):
+    return await aclient.chat.completions.create(timeout=15, **kwargs)
+
+GPT_CACHE_DAYS = 7
+
+# sync SQLite helpers, run in a worker thread so the shared event loop never
+# blocks on the reader pool or the writer lock
+def _cache_get(key):
+    with db.read() as rd:
+        return rd.execute(
+            "SELECT response FROM gpt_cache WHERE key=? AND ts > datetime('now', ?)",
+            (key, f"-{GPT_CACHE_DAYS} days")
+        ).fetchone()
+
+def _cache_put(key, out):
+    with db.write() as w:
+        w.execute("INSERT OR REPLACE INTO gpt_cache(key,response) VALUES (?,?)", (key, out))
+
+async def openai_chat_async(system_prompt, user_content, model="gpt-4o-mini", temp=0.2,
+                            json_mode=False, max_tokens=None):
+    # only near-deterministic calls are worth replaying from disk
+    cacheable = temp <= 0.3
+    loop = asyncio.get_running_loop()
+    if cacheable:
+        key = hashlib.sha256(
+            f"{model}|{temp}|{json_mode}|{max_tokens}|{system_prompt}|{user_content}".encode()
+        ).hexdigest()
+        hit = await loop.run_in_executor(None, _cache_get, key)
+        if hit:
+            return hit[0]
+    extra = {"response_format": {"type": "json_object"}} if json_mode else {}
+    if max_tokens:
+        extra["max_tokens"] = max_tokens
+    r = await _create_chat_async(
         model=model,
-        messages=[{"role":"user","content":prompt}],
-        temperature=temp
+        messages=[
+            {"role":"system","content":system_prompt},
+            {"role":"user","content":user_content}
+        ],
+        temperature=temp,
+        **extra
     )
-    return r.choices[0].message.content.strip()
+    choice = r.choices[0]
+    # content is None on a refusal or a content_filter stop
+    out = (choice.message.content or "").strip()
+    # a reply cut off by max_tokens must not be replayed from the cache
+    if cacheable and out and choice.finish_reason == "stop":
+        await loop.run_in_executor(None, _cache_put, key, out)
+    return out
 
-def filter_news_with_gpt(news_list):
-    h = "\n".join(news_list)
-    prompt = f"""You are a research assistant for Sales at Oxford Economics.
-From these headlines, return only B2B-relevant items for European companies in {sector}.
-Output as Title | Link | pubDate | Region, sorted newest first:
+def openai_chat(*args, **kwargs):
+    return run_async(openai_chat_async(*args, **kwargs))
 
-{h}
-"""
-    return openai_chat(prompt)
+STREAM_DONE = object()
 
-assign_persona   = lambda t: openai_chat(f"Given headline: '{t}', list one relevant persona.")
-score_impact     = lambda t: openai_chat(f"Rate impact 1-5: '{t}'. Reply with only the number.")
-generate_subject = lambda t: openai_chat(f"Write a 6-8 word subject line for: '{t}'.")
-generate_email   = lambda t,p: openai_chat(
-    f"Persona: {p}\nHeadline: {t}\nWrite a concise outreach email.", temp=0.7
-)
+async def _stream_into(q, system_prompt, user_content, model, temp, max_tokens):
+    extra = {"max_tokens": max_tokens} if max_tokens else {}
+    try:
+        stream = await _create_chat_async(
+            model=model,
+            messages=[
+                {"role":"system","content":system_prompt},
+                {"role":"user","content":user_content}
+            ],
+            temperature=temp,
+            stream=True,
+            **extra
+        )
+        async for chunk in stream:
+            if chunk.choices:
+                q.put(chunk.choices[0].delta.content or "")
+    finally:
+        q.put(STREAM_DONE)
+
+def openai_chat_stream(system_prompt, user_content, model="gpt-4o-mini", temp=0.7, max_tokens=None):
+    # the request starts on the shared loop right away, so several streams
+    # progress at once; the script thread drains each queue when it gets there
+    q = queue.Queue()
+    fut = asyncio.run_coroutine_threadsafe(
+        _stream_into(q, system_prompt, user_content, model, temp, max_tokens),
+        get_event_loop()
+    )
+    def drain():
+        while (piece := q.get()) is not STREAM_DONE:
+            yield piece
+        fut.result()  # re-raise an API error from the stream
+    return drain()
+
+@st.cache_data(ttl=1800, show_spinner=False)
+def filter_news_with_gpt(sector, news_list):
+    # send titles only and get back index,region pairs; rows are rebuilt locally
+    numbered = "\n".join(
+        f"{i}. {item.rsplit(' | ', 2)[0]}" for i, item in enumerate(news_list, 1)
+    )
+    reply = openai_chat(
+        FILTER_SYSTEM, PROMPT_FILTER.format(sector=sector, headlines=numbered),
+        max_tokens=200
+    )
+    picked = {}
+    for rec in csv.reader(reply.splitlines()):
+        if len(rec) < 2 or not rec[0].strip().isdigit():
+            continue
+        idx = int(rec[0])
+        if 1 <= idx <= len(news_list):
+            picked[idx] = rec[1].strip()
+    return {news_list[i-1]: region for i, region in picked.items()}
+
+# best-guess region by publisher, for items kept without asking GPT
+REGION_BY_DOMAIN = {
+    "ft.com": "UK",
+    "bloomberg.com": "US",
+    "reuters.com": "Global",
+}
+
+def region_for(link):
+    host = urlparse(link).netloc
+    for domain, region in REGION_BY_DOMAIN.items():
+        if host == domain or host.endswith("." + domain):
+            return region
+    return "Global"
+
+def local_filter(entries, sector, min_score=1):
+    # keyword hits are kept locally; only the zero-hit leftovers go to GPT
+    pat = SECTOR_PATTERN[sector]
+    picked, borderline = {}, []
+    for item in entries:
+        title, link, _ = item.rsplit(" | ", 2)
+        if len(pat.findall(title)) >= min_score:
+            picked[item] = region_for(link)
+        else:
+            borderline.append(item)
+    return picked, borderline
+
+ANALYSIS_KEYS = ("persona", "impact", "subject")
+
+async def analyze_headline(prompt, sem):
+    async with sem:
+        try:
+            raw = await openai_chat_async(ANALYZE_SYSTEM, prompt, json_mode=True, max_tokens=100)
+        except openai.OpenAIError:
+            # retries are exhausted; fail this headline, not the whole batch
+            return None
+    # None marks a bad reply: the headline shows blank fields and is not cached
+    try:
+        data = json.loads(raw)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    # the model occasionally drops a key or returns impact as a number
+    return {k: str(data.get(k, "")).strip() for k in ANALYSIS_KEYS}
+
+def stream_email(t, p):
+    return openai_chat_stream(EMAIL_SYSTEM, PROMPT_EMAIL.format(persona=p, title=t), temp=0.7, max_tokens=400)
+
+@openai_retry
+def embed(texts):
+    r = client.embeddings.create(model="text-embedding-3-small", input=list(texts), timeout=15)
+    return np.array([d.embedding for d in r.data], dtype=np.float32)
+
+async def _analyze_all(titles, concurrency=16):
+    sem = asyncio.Semaphore(concurrency)
+    prompts = [PROMPT_ANALYZE.format(title=t) for t in titles]
+    return await asyncio.gather(*[analyze_headline(p, sem) for p in prompts])
+
+def analyze_headlines(titles, threshold=0.92):
+    results = [None] * len(titles)
+    with db.read() as rd:
+        for j, t in enumerate(titles):
+            hit = rd.execute(
+                "SELECT analysis FROM embeddings WHERE headline=? AND ts > datetime('now', ?)",
+                (t, f"-{GPT_CACHE_DAYS} days")
+            ).fetchone()
+            if hit:
+                results[j] = json.loads(hit[0])
+    todo = [j for j, r in enumerate(results) if r is None]
+    if not todo:
+        return results
+
+    # one batched embeddings call; vectors are unit length so dot == cosine
+    vecs = embed([titles[j] for j in todo])
+    with db.read() as rd:
+        cached = rd.execute(
+            "SELECT vec, analysis FROM embeddings WHERE ts > datetime('now', ?)",
+            (f"-{GPT_CACHE_DAYS} days",)
+        ).fetchall()
+    if cached:
+        mat = np.stack([np.frombuffer(v, dtype=np.float32) for v, _ in cached])
+        sims = vecs @ mat.T
+        for k, j in enumerate(todo):
+            best = sims[k].argmax()
+            if sims[k, best] > threshold:
+                results[j] = json.loads(cached[best][1])
+
+    misses = [k for k, j in enumerate(todo) if results[j] is None]
+    fresh = run_async(_analyze_all([titles[todo[k]] for k in misses]))
+    for k, data in zip(misses, fresh):
+        results[todo[k]] = data
+    # store semantic hits too, so the next rerun finds them by exact headline;
+    # failed analyses stay out so a later run asks the model again
+    with db.write() as w:
+        for k, j in enumerate(todo):
+            if results[j] is None:
+                continue
+            w.execute(
+                "INSERT OR REPLACE INTO embeddings(headline,vec,analysis,ts) VALUES (?,?,?,CURRENT_TIMESTAMP)",
+                (titles[j], vecs[k].tobytes(), json.dumps(results[j]))
+            )
+    blank = dict.fromkeys(ANALYSIS_KEYS, "")
+    return [r if r is not None else blank for r in results]
 
 # --- Fetch & Analyze Button ---
 if st.button("🔍 Fetch & Analyze"):
-    st.session_state.raw_news = fetch_recent_news(keywords_by_sector[sector])
-    if st.session_state.raw_news:
-        st.session_state.filtered_news = filter_news_with_gpt(st.session_state.raw_news)
-    else:
-        st.session_state.filtered_news = ""
+    st.session_state.raw_news = fetch_recent_news(FEEDS_BY_SECTOR[sector])
+    raw = st.session_state.raw_news
+    picked, borderline = local_filter(raw, sector)
+    if borderline:
+        picked.update(filter_news_with_gpt(sector, tuple(borderline)))
+    # raw is newest first, so keep its order; split from the right since titles may contain "|"
+    st.session_state.filtered_news = [
+        tuple(p.strip() for p in h.rsplit(" | ", 2)) + (picked[h],)
+        for h in raw if h in picked
+    ]
 
 # --- Display Raw News ---
 if st.session_state.raw_news:
@@ -179,41 +670,49 @@ if st.session_state.raw_news:
 
 # --- Display Filtered & Email Workflow ---
 if st.session_state.filtered_news:
-    for i, row in enumerate(st.session_state.filtered_news.split("\n")):
-        if "|" not in row:
-            continue
-        title, link, pubDate = [p.strip() for p in row.split("|",3)][:3]
+    rows = st.session_state.filtered_news
+    results = analyze_headlines([r[0] for r in rows])
+
+    # start every missing draft at once; the loop below writes them out in order
+    drafts = st.session_state.email_drafts
+    pending = {
+        r[0]: stream_email(r[0], data["persona"])
+        for r, data in zip(rows, results) if r[0] not in drafts
+    }
+
+    for i, ((title, link, pubDate, _region), data) in enumerate(zip(rows, results)):
         st.markdown(f"### {i+1}. [{title}]({link})")
         st.markdown(f"🗓️ {pubDate}")
 
-        persona = assign_persona(title)
-        impact  = score_impact(title)
-        subject = generate_subject(title)
-        email   = generate_email(title, persona)
+        persona, impact, subject = data["persona"], data["impact"], data["subject"]
 
         st.write(f"**Impact:** {impact}/5  |  **Persona:** {persona}")
-        st.text_input("Subject", subject, key=f"subj_{i}")
-        st.text_area("Email draft", email, height=200, key=f"email_{i}")
+        subject = st.text_input("Subject", subject, key=f"subj_{i}")
+
+        # stream the draft once, then keep it so reruns don't regenerate it
+        email_slot = st.empty()
+        if title not in drafts:
+            with email_slot.container():
+                drafts[title] = st.write_stream(pending[title])
+        email = email_slot.text_area("Email draft", drafts[title], height=200, key=f"email_{i}")
+        # copies in the browser; no server round-trip or rerun
+        st_copy_to_clipboard(f"Subject: {subject}\n\n{email}", key=f"copy_{i}")
 
         col1, col2, col3 = st.columns(3)
         if col1.button("Mark as Used", key=f"used_{i}"):
-            c.execute(
-                "INSERT INTO outreach(user,title,used) VALUES (?,?,1)",
-                (user, title)
-            )
-            conn.commit()
+            with db.write() as w:
+                st.session_state.outreach_ids[title] = w.execute(
+                    SQL_MARK_USED, (user, title)
+                ).lastrowid
+            _load_stats.clear()
             st.success("Marked as used")
         if col2.button("✔️ Success", key=f"succ_{i}"):
-            c.execute(
-                "UPDATE outreach SET success=1 WHERE user=? AND title=? ORDER BY ts DESC LIMIT 1",
-                (user, title)
-            )
-            conn.commit()
-            st.success("Marked success")
+            if mark_outcome(title, 1):
+                st.success("Marked success")
+            else:
+                st.warning("Mark as used first")
         if col3.button("❌ Fail", key=f"fail_{i}"):
-            c.execute(
-                "UPDATE outreach SET success=0 WHERE user=? AND title=? ORDER BY ts DESC LIMIT 1",
-                (user, title)
-            )
-            conn.commit()
-            st.error("Marked fail")
+            if mark_outcome(title, 0):
+                st.error("Marked fail")
+            else:
+                st.warning("Mark as used first")